@@ -24,6 +24,7 @@ _the_docker: Optional[docker.DockerClient] = None
 class DockerClient:
     def __init__(self, lib_client: docker.DockerClient):
         self.lib_client = lib_client
+        self._network_cache: dict[str, docker.models.networks.Network] = {}
 
     @classmethod
     def get_client(cls) -> DockerClient:
@@ -33,15 +34,24 @@ class DockerClient:
         return _the_docker
 
     def create_network(self, network_name: str) -> docker.models.networks.Network:
-        existing = self.lib_client.networks.list(names=[network_name])
-        if existing:
-            network = existing[0]
-        else:
-            network = self.lib_client.networks.create(network_name, driver="bridge")
+        network = self._network_cache.get(network_name)
+        if network is not None:
+            return network
+        try:
+            network = self.lib_client.networks.create(
+                network_name, driver="bridge", check_duplicate=True
+            )
             logger.info("Created network %s", network_name)
+        except docker.errors.APIError:
+            existing = self.lib_client.networks.list(names=[network_name])
+            if not existing:
+                raise
+            network = existing[0]
+        self._network_cache[network_name] = network
         return network
 
     def remove_network(self, network_name: str) -> None:
+        self._network_cache.pop(network_name, None)
         networks = self.lib_client.networks.list(names=[network_name])
         if networks:
             networks[0].remove()
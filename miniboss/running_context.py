@@ -16,9 +16,18 @@ class RunningContext:
             service: ServiceAgent(service, options, self)
             for name, service in services_by_name.items()
         }
+        # Reverse-dependency index, so that a finished service only has to
+        # notify the agents that actually depend on it
+        self.dependents: dict[Service, list[ServiceAgent]] = {}
+        for agent in self.agent_set.values():
+            for dependency in agent.service.dependencies:
+                self.dependents.setdefault(dependency, []).append(agent)
         self.failed_services: list[Service] = []
         self.processed_services: list[Service] = []
         self.service_pop_lock = threading.Lock()
+        # Signaled whenever an agent finishes, so that the dispatching thread
+        # can wake up instead of polling.
+        self.wakeup_event = threading.Event()
 
     @property
     def done(self) -> bool:
@@ -30,31 +39,47 @@ class RunningContext:
 
     @property
     def ready_to_start(self) -> list[ServiceAgent]:
-        return [x for x in self.agent_set.values() if x.can_start]
+        # Snapshot under the lock; agent threads remove entries concurrently
+        with self.service_pop_lock:
+            return [x for x in self.agent_set.values() if x.can_start]
 
     @property
     def ready_to_stop(self) -> list[ServiceAgent]:
-        return [x for x in self.agent_set.values() if x.can_stop]
+        with self.service_pop_lock:
+            return [x for x in self.agent_set.values() if x.can_stop]
 
     def service_failed(self, failed_service: Service) -> None:
-        with self.service_pop_lock:
-            self.agent_set.pop(failed_service)
-            self.failed_services.append(failed_service)
-        services_left = list(self.agent_set.keys())
-        for service in services_left:
-            if failed_service in service.dependencies:
-                self.service_failed(service)
+        # The failure cascade is run with an explicit stack instead of
+        # recursion, so that deep dependency chains cannot hit the recursion
+        # limit
+        to_fail = [failed_service]
+        while to_fail:
+            failing = to_fail.pop()
+            with self.service_pop_lock:
+                if failing not in self.agent_set:
+                    # Another thread already registered this failure;
+                    # recording it twice would corrupt the failure list
+                    continue
+                del self.agent_set[failing]
+                self.failed_services.append(failing)
+                services_left = list(self.agent_set.keys())
+            for service in services_left:
+                if failing in service.dependencies:
+                    to_fail.append(service)
+        self.wakeup_event.set()
 
     def service_started(self, started_service: Service) -> None:
         with self.service_pop_lock:
-            self.agent_set.pop(started_service)
+            del self.agent_set[started_service]
             self.processed_services.append(started_service)
-            for agent in self.agent_set.values():
+            for agent in self.dependents.get(started_service, []):
                 agent.process_service_started(started_service)
+        self.wakeup_event.set()
 
     def service_stopped(self, stopped_service: Service) -> None:
         with self.service_pop_lock:
-            self.agent_set.pop(stopped_service)
+            del self.agent_set[stopped_service]
             self.processed_services.append(stopped_service)
             for agent in self.agent_set.values():
                 agent.process_service_stopped(stopped_service)
+        self.wakeup_event.set()
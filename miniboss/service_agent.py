@@ -19,6 +19,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+PING_INITIAL_DELAY = 0.1
+PING_MAX_DELAY = 2
+
 
 def container_env(container):
     env = container.attrs["Config"]["Env"]
@@ -44,8 +47,8 @@ class ServiceAgent(threading.Thread):
         self.service = service
         self.options = options
         self.context = context
-        self.open_dependencies = service.dependencies[:]
-        self.open_dependants = service._dependants[:]
+        self.open_dependencies = {dep.name for dep in service.dependencies}
+        self.open_dependants = {dep.name for dep in service._dependants}
         self.run_condition = RunCondition()
         self.status = AgentStatus.NULL
         self._action = None
@@ -65,23 +68,21 @@ class ServiceAgent(threading.Thread):
 
     @property
     def can_start(self):
-        return self.open_dependencies == [] and self.status == AgentStatus.NULL
+        return not self.open_dependencies and self.status == AgentStatus.NULL
 
     @property
     def can_stop(self):
-        return self.open_dependants == [] and self.status == AgentStatus.NULL
+        return not self.open_dependants and self.status == AgentStatus.NULL
 
     @property
     def container_name_prefix(self):
         return f"{self.service.name:s}-{types.group_name:s}"
 
     def process_service_started(self, service):
-        if service in self.open_dependencies:
-            self.open_dependencies.remove(service)
+        self.open_dependencies.discard(service.name)
 
     def process_service_stopped(self, service):
-        if service in self.open_dependants:
-            self.open_dependants.remove(service)
+        self.open_dependants.discard(service.name)
 
     def build_image(self):
         client = DockerClient.get_client()
@@ -170,21 +171,32 @@ class ServiceAgent(threading.Thread):
 
     def ping(self):
         start = time.monotonic()
-        while time.monotonic() - start < self.options.timeout:
+        delay = PING_INITIAL_DELAY
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= self.options.timeout:
+                break
             if self.service.ping():
                 logger.info("Service %s pinged successfully", self.service.name)
                 self.run_condition.pinged()
                 return True
-            time.sleep(0.1)
+            # Exponential backoff bounded by the remaining time until the
+            # timeout deadline
+            time.sleep(min(delay, self.options.timeout - elapsed))
+            delay = min(delay * 2, PING_MAX_DELAY)
         logger.error("Could not ping service with timeout of %d", self.options.timeout)
         return False
 
     def start_service(self):
         self.action = Actions.START
+        # Set in the dispatching thread so that the agent cannot be picked up
+        # again before the thread gets a chance to run
+        self.status = AgentStatus.IN_PROGRESS
         self.start()
 
     def stop_service(self):
         self.action = Actions.STOP
+        self.status = AgentStatus.IN_PROGRESS
         self.start()
 
     def run(self):
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
 import logging
-import time
-from collections import Counter, deque
+from collections import deque
 from collections.abc import Mapping
 from typing import Any, Callable, Union
 
@@ -21,7 +20,11 @@ ALLOWED_STOP_SIGNALS = ["SIGINT", "SIGTERM", "SIGKILL", "SIGQUIT"]
 
 
 class ServiceMeta(type):
-    # pylint: disable=too-many-branches,too-many-statements
+    # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+    # Bumped whenever a service class is defined; used to invalidate the
+    # memoized subclass discovery in load_definitions
+    _definition_count = 0
+
     def __new__(cls, name, bases, attrdict):
         if not bases:
             return super().__new__(cls, name, bases, attrdict)
@@ -33,6 +36,21 @@ class ServiceMeta(type):
             raise ServiceDefinitionError(
                 f"Field 'image' of service class {name:s} must be a non-empty string"
             )
+        if "dependencies" in attrdict:
+            dependencies = attrdict["dependencies"]
+            if not isinstance(dependencies, list):
+                raise ServiceDefinitionError(
+                    f"Field 'dependencies' of service class {name:s} must be a list"
+                )
+            dependency_names = [x for x in dependencies if isinstance(x, str)]
+            if len(dependency_names) != len(set(dependency_names)):
+                raise ServiceDefinitionError(
+                    f"Dependencies of service class {name:s} contain duplicates"
+                )
+            if attrdict["name"] in dependency_names:
+                raise ServiceDefinitionError(
+                    f"Service class {name:s} cannot depend on itself"
+                )
         if "ports" in attrdict and not isinstance(attrdict["ports"], Mapping):
             raise ServiceDefinitionError(
                 f"Field 'ports' of service class {name:s} must be a mapping"
@@ -123,6 +141,10 @@ class ServiceMeta(type):
                 raise ServiceDefinitionError(
                     "Volumes have to be defined either as a list of strings or a dict"
                 )
+        ServiceMeta._definition_count += 1
+        # Also drop the memoized discovery results right away, so that the
+        # cache does not keep replaced classes alive
+        _subclass_cache.clear()
         return super().__new__(cls, name, bases, attrdict)
 
 
@@ -131,6 +153,7 @@ class Service(metaclass=ServiceMeta):
     image: str = ""
     dependencies: list[Service] = []
     _dependants: list[Service] = []
+    _resolved_deps: Union[tuple[Service, ...], None] = None
     ports: dict[int, int] = {}
     env: dict[str, Any] = {}
     always_start_new = False
@@ -168,16 +191,19 @@ class Service(metaclass=ServiceMeta):
 
 
 def connect_services(services: list[Service]) -> dict[str, Service]:
-    name_counter: Counter[str] = Counter()
+    all_by_name: dict[str, Service] = {}
+    multiples = []
     for service in services:
-        name_counter[service.name] += 1
-    multiples = [name for name, count in name_counter.items() if count > 1]
+        if service.name in all_by_name and service.name not in multiples:
+            multiples.append(service.name)
+        all_by_name[service.name] = service
     if multiples:
         raise ServiceLoadError(f'Repeated service names: {",".join(multiples)}')
-    all_by_name = {service.name: service for service in services}
     for service in services:
-        if isinstance(service, str):
-            service = all_by_name[service]
+        if getattr(service, "_resolved_deps", None) is not None:
+            # Already resolved to service objects, e.g. by an earlier call on
+            # the same instances; nothing to do.
+            continue
         actual_deps = []
         for dependency in service.dependencies:
             if isinstance(dependency, str):
@@ -187,21 +213,41 @@ def connect_services(services: list[Service]) -> dict[str, Service]:
                     )
                 dependency = all_by_name[dependency]
             actual_deps.append(dependency)
+        # The resolved dependencies are set on the instance, leaving the
+        # string-valued class attribute intact
         service.dependencies = actual_deps
+        service._resolved_deps = tuple(actual_deps)
     for service in services:
         service._dependants = [x for x in services if service in x.dependencies]
     return all_by_name
 
 
+_subclass_cache: dict[type, tuple[int, list[type]]] = {}
+
+
+def _discover_subclasses(base_class: type) -> list[type]:
+    cached = _subclass_cache.get(base_class)
+    if cached is not None and cached[0] == ServiceMeta._definition_count:
+        return cached[1]
+    # Drop the stale strong references before the walk, so that deleted or
+    # redefined classes can be collected and fall out of __subclasses__()
+    _subclass_cache.pop(base_class, None)
+    cached = None
+    subclasses = base_class.__subclasses__()
+    _subclass_cache[base_class] = (ServiceMeta._definition_count, subclasses)
+    return subclasses
+
+
 class ServiceCollection:
     def __init__(self):
         self.all_by_name = {}
         self._base_class = Service
         self.running_context = None
         self.excluded = []
+        self._topo_order = []
 
     def load_definitions(self):
-        services = self._base_class.__subclasses__()
+        services = _discover_subclasses(self._base_class)
         if len(services) == 0:
             raise ServiceLoadError("No services defined")
         self.all_by_name = connect_services(list(service() for service in services))
@@ -209,11 +255,12 @@ class ServiceCollection:
 
     def exclude_for_start(self, exclude):
         self.excluded = exclude
+        excluded_names = frozenset(exclude)
         for service in self.all_by_name.values():
-            if service.name in exclude:
+            if service.name in excluded_names:
                 continue
             excluded_deps = [
-                dep.name for dep in service.dependencies if dep.name in exclude
+                dep.name for dep in service.dependencies if dep.name in excluded_names
             ]
             if excluded_deps:
                 msg = f"{excluded_deps[0]} is to be excluded, but {service.name:s} depends on it"
@@ -228,10 +275,13 @@ class ServiceCollection:
 
     def exclude_for_stop(self, exclude):
         self.excluded = exclude
+        excluded_names = frozenset(exclude)
         for service_name in exclude:
             service = self.all_by_name[service_name]
             deps_to_be_stopped = [
-                dep.name for dep in service.dependencies if dep.name not in exclude
+                dep.name
+                for dep in service.dependencies
+                if dep.name not in excluded_names
             ]
             if deps_to_be_stopped:
                 msg = f"{deps_to_be_stopped[0]} is to be stopped, but {service.name} depends on it"
@@ -239,25 +289,27 @@ class ServiceCollection:
             self.all_by_name.pop(service_name)
 
     def check_circular_dependencies(self):
-        with_dependencies = [
-            x for x in self.all_by_name.values() if x.dependencies != []
-        ]
-        # pylint: disable=cell-var-from-loop
-        for service in with_dependencies:
-            start = service.name
-            count = 0
-
-            def go_up_dependencies(checked):
-                nonlocal count
-                count += 1
-                for dependency in checked.dependencies:
-                    if dependency.name == start:
-                        raise ServiceLoadError("Circular dependency detected")
-                    if count == len(self.all_by_name):
-                        return
-                    go_up_dependencies(dependency)
-
-            go_up_dependencies(service)
+        # A single Kahn's algorithm pass; cycle detection falls out of the
+        # topological sort, so the whole check is linear in the size of the
+        # dependency graph.
+        in_degree = {name: 0 for name in self.all_by_name}
+        dependants = {name: [] for name in self.all_by_name}
+        for service in self.all_by_name.values():
+            in_degree[service.name] = len(service.dependencies)
+            for dependency in service.dependencies:
+                dependants[dependency.name].append(service.name)
+        queue = deque(name for name, degree in in_degree.items() if degree == 0)
+        order = []
+        while queue:
+            name = queue.popleft()
+            order.append(name)
+            for dependant in dependants[name]:
+                in_degree[dependant] -= 1
+                if in_degree[dependant] == 0:
+                    queue.append(dependant)
+        if len(order) != len(self.all_by_name):
+            raise ServiceLoadError("Circular dependency detected")
+        self._topo_order = order
 
     def __len__(self):
         return len(self.all_by_name)
@@ -276,26 +328,42 @@ class ServiceCollection:
         docker = DockerClient.get_client()
         network = docker.create_network(options.network.name)
         options.network.id = network.id
-        self.running_context = RunningContext(self.all_by_name, options)
+        services = self.all_by_name
+        if self._topo_order:
+            # Hand the services to the running context in topological order,
+            # so that each wave of ready agents is dispatched dependencies
+            # first
+            services = {
+                name: self.all_by_name[name]
+                for name in self._topo_order
+                if name in self.all_by_name
+            }
+        self.running_context = RunningContext(services, options)
         while not self.running_context.done:
+            self.running_context.wakeup_event.clear()
             for agent in self.running_context.ready_to_start:
                 agent.start_service()
-            time.sleep(0.01)
-        failed = []
+            if self.running_context.done:
+                break
+            self.running_context.wakeup_event.wait()
+        failed = set()
         if self.running_context.failed_services:
-            failed = [x.name for x in self.running_context.failed_services]
+            failed = {x.name for x in self.running_context.failed_services}
             logger.error("Failed to start following services: %s", ",".join(failed))
-        return [x for x in self.all_by_name.keys() if x not in failed]
+        return [name for name in self.all_by_name if name not in failed]
 
     def stop_all(self, options: Options) -> list[str]:
         docker = DockerClient.get_client()
         self.running_context = RunningContext(self.all_by_name, options)
         stopped = []
         while not (self.running_context.done or self.running_context.failed_services):
+            self.running_context.wakeup_event.clear()
             for agent in self.running_context.ready_to_stop:
                 agent.stop_service()
                 stopped.append(agent.service.name)
-            time.sleep(0.01)
+            if self.running_context.done or self.running_context.failed_services:
+                break
+            self.running_context.wakeup_event.wait()
         if options.remove and not self.excluded:
             docker.remove_network(options.network.name)
         return stopped
@@ -1,3 +1,4 @@
+import gc
 import json
 import os
 import pathlib
@@ -72,6 +73,28 @@ class ServiceDefinitionTests(unittest.TestCase):
                 env = {}
                 always_start_new = 123
 
+    def test_invalid_dependencies(self):
+        with pytest.raises(ServiceDefinitionError):
+
+            class NewService(Service):
+                name = "yes"
+                image = "yes"
+                dependencies = "other"
+
+        with pytest.raises(ServiceDefinitionError):
+
+            class NewService(Service):
+                name = "yes"
+                image = "yes"
+                dependencies = ["other", "other"]
+
+        with pytest.raises(ServiceDefinitionError):
+
+            class NewService(Service):
+                name = "yes"
+                image = "yes"
+                dependencies = ["yes"]
+
     def test_invalid_signal_name(self):
         with pytest.raises(ServiceDefinitionError):
 
@@ -345,6 +368,37 @@ class ServiceCollectionTests(unittest.TestCase):
         collection.load_definitions()
         assert len(collection) == 3
 
+    def test_load_definitions_after_class_redefinition(self):
+        # Simulates a module reload in a long-running process: the replaced
+        # class should drop out of discovery instead of showing up as a
+        # duplicate service name
+        collection = ServiceCollection()
+
+        class NewServiceBase(Service):
+            name = "not used"
+            image = "not used"
+
+        collection._base_class = NewServiceBase
+
+        class ServiceOne(NewServiceBase):
+            name = "hello"
+            image = "hello"
+
+        collection.load_definitions()
+        assert len(collection) == 1
+
+        class ServiceOne(NewServiceBase):
+            name = "hello"
+            image = "hello"
+
+        collection = ServiceCollection()
+        collection._base_class = NewServiceBase
+        # Class objects are cyclic, so the replaced class is gone only after
+        # a collector pass
+        gc.collect()
+        collection.load_definitions()
+        assert len(collection) == 1
+
     def test_exclude_for_start(self):
         collection = ServiceCollection()
 